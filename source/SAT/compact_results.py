@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+SAT-ResultsCompactor: Merge the result records appended by each run to
+res/SAT/<instance_id>.jsonl into the res/SAT/<instance_id>.json files.
+"""
+
+import os
+import json
+import argparse
+import pathlib
+
+import orjson
+
+# Define path for results
+res_dir = pathlib.Path(__file__).parent.parent.parent / 'res' / 'SAT'
+
+
+def format_results(data: dict) -> str:
+    """
+    Same layout as the SMT results (solve_smt_instance.format_results): the
+    values go through json.dumps, not orjson, whose compact `[1,2]` spacing
+    would differ from every other results file.
+    """
+    entries = []
+    for test_name, result in data.items():
+        fields = ",\n".join(
+            f"        {json.dumps(key)}: {json.dumps(value)}"
+            for key, value in result.items()
+        )
+        entries.append(f"    {json.dumps(test_name)}: {{\n{fields}\n    }}")
+    return "{\n" + ",\n".join(entries) + "\n}"
+
+
+def append_result(instance_id: str, result: dict) -> pathlib.Path:
+    """
+    Append one run's result ({test_name: {...}}) as a line of the instance log.
+    """
+    os.makedirs(res_dir, exist_ok=True)
+    log_path = res_dir / f'{instance_id}.jsonl'
+    with open(log_path, 'ab') as f:
+        f.write(orjson.dumps(result) + b"\n")
+    return log_path
+
+
+def compact(instance_id: str) -> pathlib.Path:
+    """
+    Fold the instance log into its JSON results file (later records win)
+    and remove the log.
+    """
+    res_path = res_dir / f'{instance_id}.json'
+    log_path = res_dir / f'{instance_id}.jsonl'
+    if not log_path.exists():
+        return res_path
+
+    data = {}
+    if res_path.exists():
+        data = orjson.loads(res_path.read_bytes())
+
+    with open(log_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                data.update(orjson.loads(line))
+
+    # Write atomically, then drop the merged log
+    tmp_path = res_path.with_suffix('.json.tmp')
+    tmp_path.write_text(format_results(data))
+    os.replace(tmp_path, res_path)
+    log_path.unlink()
+    return res_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAT-ResultsCompactor: merge .jsonl run logs into .json results")
+    parser.add_argument("instance_ids", nargs="*",
+                        help="Instances to compact (default: every pending log)")
+    args = parser.parse_args()
+
+    instance_ids = args.instance_ids or sorted(p.stem for p in res_dir.glob('*.jsonl'))
+    for instance_id in instance_ids:
+        print(f"  Results compacted to: {compact(instance_id)}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
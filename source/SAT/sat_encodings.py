@@ -1,5 +1,6 @@
 from typing import List
 from z3 import And, Or, Not, Bool, BoolRef
+from pysat.card import CardEnc, EncType
 
 def at_least_one(bs: List[BoolRef]) -> BoolRef:
     return Or(bs)
@@ -15,6 +16,23 @@ def at_most_one(bs: List[BoolRef]) -> List[BoolRef]:
 def exactly_one(bs: List[BoolRef]) -> BoolRef:
     return And(at_least_one(bs), *at_most_one(bs))
 
+def exactly_one_seq(bs: List[BoolRef], name: str) -> List[BoolRef]:
+    """
+    Sequential-counter encoding (PySAT CardEnc), linear in len(bs) instead of
+    the quadratic pairwise one. Auxiliaries become Bools named {name}_{id}.
+    """
+    k = len(bs)
+    cnf = CardEnc.equals(lits=list(range(1, k + 1)), bound=1, top_id=k, encoding=EncType.seqcounter)
+    lit_of = {}
+
+    def to_z3(lit: int) -> BoolRef:
+        v = abs(lit)
+        if v not in lit_of:
+            lit_of[v] = bs[v - 1] if v <= k else Bool(f"{name}_{v}")
+        return lit_of[v] if lit > 0 else Not(lit_of[v])
+
+    return [Or(*[to_z3(lit) for lit in clause]) for clause in cnf.clauses]
+
 def at_most_k(bool_vars: List[BoolRef], k: int, name: str) -> List[BoolRef]:
     """Sequential encoding."""
     n = len(bool_vars)
@@ -55,13 +73,38 @@ def less_onehot_strict(x: List[BoolRef], y: List[BoolRef]) -> BoolRef:
     n = len(x)
     return Or(*[And(x[i], Or(*y[i+1:])) for i in range(n - 1)])
 
-def lex_less_onehot_seq(X: List[List[BoolRef]], Y: List[List[BoolRef]]) -> BoolRef:
-    """Strict lex on sequences of one-hots: X <_lex Y."""
-    terms = []
-    for k in range(len(X)):
-        prefix_eq = And(*[equal_onehot(X[i], Y[i]) for i in range(k)])
-        terms.append(And(prefix_eq, less_onehot_strict(X[k], Y[k])))
-    return Or(*terms)
+def lex_less_onehot_seq(X: List[List[BoolRef]], Y: List[List[BoolRef]], name: str) -> List[BoolRef]:
+    """
+    Strict lex on sequences of one-hots: X <_lex Y (assume EO elsewhere).
+    Plaisted-Greenbaum clauses: the constraint is only ever asserted, so each
+    auxiliary only needs the implication towards its definition.
+      eq_k  → X[:k] == Y[:k]          (prefix chain)
+      lt_k  → eq_k ∧ index(X[k]) < index(Y[k])
+      lt_0 ∨ … ∨ lt_{L-1}
+    """
+    L = len(X)
+    constraints: List[BoolRef] = []
+    eq = [None] + [Bool(f"{name}_eq_{k}") for k in range(1, L)]
+    lt = [Bool(f"{name}_lt_{k}") for k in range(L)]
+
+    for k in range(1, L):
+        if k > 1:
+            constraints.append(Or(Not(eq[k]), eq[k - 1]))
+        # eq_k → X[k-1] ⇔ Y[k-1] element-wise
+        for xi, yi in zip(X[k - 1], Y[k - 1]):
+            constraints.append(Or(Not(eq[k]), Not(xi), yi))
+            constraints.append(Or(Not(eq[k]), xi, Not(yi)))
+
+    for k in range(L):
+        if k > 0:
+            constraints.append(Or(Not(lt[k]), eq[k]))
+        # lt_k → index(X[k]) < index(Y[k]): X[k][i] forces some Y[k][j], j > i
+        x, y = X[k], Y[k]
+        for i in range(len(x)):
+            constraints.append(Or(Not(lt[k]), Not(x[i]), *y[i + 1:]))
+
+    constraints.append(Or(*lt))
+    return constraints
 
 # ---------- Derived one-hots from RR pos + match table ----------
 def team_onehot_from_pos(
@@ -4,6 +4,7 @@ from z3 import Solver, And, Bool, Not, Or
 
 from sat_encodings import (
     exactly_one,
+    exactly_one_seq,
     at_most_k,
     lex_less_onehot_seq     # strict lex on sequences of one-hot vectors
 )
@@ -64,7 +65,7 @@ class SATModelHA:
                     )
                     for p in range(P) for w in range(W)
                 ]
-                solver.add(exactly_one(pair_codes))
+                solver.add(*exactly_one_seq(pair_codes, name=f"pair_{i}_{j}"))
 
         #--- Main constraint: each team plays exactly once per week
         for w in range(W):
@@ -95,13 +96,13 @@ class SATModelHA:
             for p in range(P - 1):
                 Xp = [Away[p][w]     for w in range(W)] + [Home[p][w]     for w in range(W)]
                 Yp = [Away[p + 1][w] for w in range(W)] + [Home[p + 1][w] for w in range(W)]
-                solver.add(lex_less_onehot_seq(Xp, Yp))
+                solver.add(*lex_less_onehot_seq(Xp, Yp, name=f"lex_p{p}"))
 
             #--- Symmetry breaking: strict lex between weeks (columns)
             # Compare concatenation [Away[p][w] for p] ++ [Home[p][w] for p]  vs  w+1
             for w in range(W - 1):
                 Xw = [Away[p][w]     for p in range(P)] + [Home[p][w]     for p in range(P)]
                 Yw = [Away[p][w + 1] for p in range(P)] + [Home[p][w + 1] for p in range(P)]
-                solver.add(lex_less_onehot_seq(Xw, Yw))
+                solver.add(*lex_less_onehot_seq(Xw, Yw, name=f"lex_w{w}"))
 
         return solver
@@ -8,6 +8,24 @@ from sat_encodings import (
     team_onehot_from_pos,    # derived team one-hot from (table,pos)
 )
 
+def match_tables(n: int) -> tuple[list[list[int]], list[list[int]]]:
+    """
+    Circle-method match tables: Home[w][k] vs Away[w][k] is the k-th match of
+    week w, canonicalized with the higher-numbered team in Home.
+    """
+    W, P = n - 1, n // 2
+    Home: list[list[int]] = [[0] * P for _ in range(W)]
+    Away: list[list[int]] = [[0] * P for _ in range(W)]
+    for w in range(1, W + 1):
+        for p in range(1, P + 1):
+            home_raw = n if p == 1 else ((w - 1) + (p - 1)) % (n - 1) + 1
+            away_raw = w if p == 1 else ((n - 1) - (p - 1) + (w - 1)) % (n - 1) + 1
+            # canonical: higher-numbered team in Home, lower in Away
+            Home[w - 1][p - 1] = max(home_raw, away_raw)
+            Away[w - 1][p - 1] = min(home_raw, away_raw)
+    return Home, Away
+
+
 class SATModelRR:
     @staticmethod
     def build_solver(
@@ -34,15 +52,7 @@ class SATModelRR:
         #====================================================================
         # PRECOMPUTED MATCH TABLES (circle method, canonicalized unordered)
         #====================================================================
-        Home: list[list[int]] = [[0] * P for _ in range(W)]
-        Away: list[list[int]] = [[0] * P for _ in range(W)]
-        for w in range(1, W + 1):
-            for p in range(1, P + 1):
-                home_raw = n if p == 1 else ((w - 1) + (p - 1)) % (n - 1) + 1
-                away_raw = w if p == 1 else ((n - 1) - (p - 1) + (w - 1)) % (n - 1) + 1
-                # canonical: higher-numbered team in Home, lower in Away
-                Home[w - 1][p - 1] = max(home_raw, away_raw)
-                Away[w - 1][p - 1] = min(home_raw, away_raw)
+        Home, Away = match_tables(n)
 
         #====================================================================
         # DECISION VARIABLES
@@ -98,7 +108,7 @@ class SATModelRR:
                      [team_onehot_from_pos(Home, pos, w, p,   n, P) for w in range(W)]
                 Yp = [team_onehot_from_pos(Away, pos, w, p+1, n, P) for w in range(W)] + \
                      [team_onehot_from_pos(Home, pos, w, p+1, n, P) for w in range(W)]
-                solver.add(lex_less_onehot_seq(Xp, Yp))
+                solver.add(*lex_less_onehot_seq(Xp, Yp, name=f"lex_p{p}"))
 
             #--- Symmetry breaking: strict lex between weeks (columns)
             # Compare concatenation [Away[w,p]] for p ++ [Home[w,p]] for p   vs  w+1
@@ -107,7 +117,7 @@ class SATModelRR:
                      [team_onehot_from_pos(Home, pos, w,   p, n, P) for p in range(P)]
                 Yw = [team_onehot_from_pos(Away, pos, w+1, p, n, P) for p in range(P)] + \
                      [team_onehot_from_pos(Home, pos, w+1, p, n, P) for p in range(P)]
-                solver.add(lex_less_onehot_seq(Xw, Yw))
+                solver.add(*lex_less_onehot_seq(Xw, Yw, name=f"lex_w{w}"))
 
         #====================================================================
         # WEEKLY HOME LITERALS (for optimization bounding)
@@ -9,6 +9,8 @@ import subprocess
 import sys
 import glob
 
+from compact_results import append_result, compact
+
 # Define paths for instances and results
 instances_path = pathlib.Path(__file__).parent.parent.parent / 'instances' / 'SAT'
 res_dir = pathlib.Path(__file__).parent.parent.parent / 'res' / 'SAT'
@@ -106,6 +108,8 @@ def main():
         prev_instance_id = int(instance_id) - 1
         prev_instance_data = None
         if prev_instance_id > 0:
+            # Fold in any runs still pending in the previous instance's log
+            compact(str(prev_instance_id))
             prev_res_path = os.path.join(res_dir, f'{prev_instance_id}.json')
             try:
                 with open(prev_res_path) as f:
@@ -130,25 +134,12 @@ def main():
                 print("  SKIP EXPERIMENT: Previous model found no solution.")
 
                 # Save empty result for this experiment
-                res_path = os.path.join(res_dir, f'{instance_id}.json')
-
-                # Load existing data if available
-                data = {}
-                if os.path.exists(res_path):
-                    with open(res_path) as f:
-                        data = json.load(f)
-
-                # Update data with empty result
-                data[exp_name] = {
+                append_result(instance_id, {exp_name: {
                     "time": 300,
                     "optimal": False,
                     "obj": "None",
                     "sol": []
-                }
-
-                # Write the JSON to the destination file
-                with open(res_path, 'w') as f:
-                    json.dump(data, f, indent=4)
+                }})
 
             else:
                 # Build the command to call the SAT solver script
@@ -177,18 +168,16 @@ def main():
                             # We save a default result for current experiment
                             # since it is likely an error in the (MiniSAT) solver
 
-                            res_path = os.path.join(res_dir, f'{instance_id}.json')
-                            data = {}
-                            if os.path.exists(res_path):
-                                with open(res_path) as f: data = json.load(f)
-                            data[exp_name] = {"time": 300, "optimal": False, "obj": "None", "sol": []}
-                            with open(res_path, 'w') as f: json.dump(data, f, indent=4)
+                            append_result(instance_id, {exp_name: {"time": 300, "optimal": False, "obj": "None", "sol": []}})
                 except Exception as e:
                     print(f"  STATUS: {'EXCEPTION':<10}")
                     print(f"  ERROR_MSG: Failed to execute subprocess: {e}")
 
             print(f"  {'─' * 60}")
 
+        # Merge the results logged by this instance's experiments
+        compact(instance_id)
+
     # Print completion message
     print("\n\n" + "*" * 50)
     print(f"* {'All SAT experiments completed!'.center(46)} *")
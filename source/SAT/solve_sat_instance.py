@@ -5,74 +5,151 @@ or directly in Z3 for RR optimization.
 """
 
 import os
-import json
 import argparse
+import contextlib
+import hashlib
+import multiprocessing
 import pathlib
+import pickle
+from functools import lru_cache, partial
 from threading import Timer
 from typing import List
 
-import jsbeautifier
 import time
 import math
 import re
+import numpy as np
 import z3
-from pysat.formula import CNF
 from pysat.solvers import Minisat22, Glucose42
 
 # Import SAT models
 from sat_model_ha import SATModelHA
-from sat_model_rr import SATModelRR
+from sat_model_rr import SATModelRR, match_tables
 
 from sat_encodings import at_most_k
+from compact_results import append_result
+
+PYSAT_SOLVERS = {"minisat": Minisat22, "glucose": Glucose42}
+
+# HA one-hot literal names, e.g. H_1_2_3 -> (kind, period, week, team)
+_HA_VAR_RE = re.compile(r'^([HA])_(\d+)_(\d+)_(\d+)$')
+# RR literal names, e.g. pos_1_2_3 -> (week, period, match) and swap_1_2 -> (week, period)
+_RR_POS_RE = re.compile(r'^pos_(\d+)_(\d+)_(\d+)$')
+_RR_SWAP_RE = re.compile(r'^swap_(\d+)_(\d+)$')
+
+# Instance size declaration, e.g. "n=10;"
+_N_RE = re.compile(rb'n\s*=\s*(\d+);')
+
+# Z3 -> CNF tactic pipeline, built once. Flattened simplification and no
+# distributivity/extra ITE clauses keep tseitin-cnf from blowing up the CNF.
+_SIMPLIFY_PARAMS = {"elim_and": True, "flat": True}
+_TSEITIN_PARAMS = {"distributivity": False, "ite_extra": False}
+_CNF_TACTIC = z3.Then(
+    z3.With("simplify", **_SIMPLIFY_PARAMS),
+    z3.With("tseitin-cnf", **_TSEITIN_PARAMS),
+)
+
+# On-disk cache of decision CNFs, keyed by the model parameters and the encoding sources
+CNF_CACHE_DIR = pathlib.Path.home() / ".cache" / "sat_tournament"
+ENCODING_SOURCES = [pathlib.Path(__file__).parent / name
+                    for name in ("sat_encodings.py", "sat_model_ha.py", "sat_model_rr.py")]
+
+# Up to this many weeks optimise_rr scans the bound downwards instead of bisecting
+LINEAR_THRESHOLD = 8
+
+
+def imbalance_constraints(H: list, n: int, B: int) -> list[z3.BoolRef]:
+    """
+    Constraints enforcing max-imbalance <= B on the weekly home literals H:
+        L = ceil((W-B)/2)  <=  home_count[t]  <=  U = floor((W+B)/2)
+    encoded via at_most_k on H[t,*] and on ~H[t,*].
+    """
+    W = n - 1
+    L = math.ceil((W - B) / 2)
+    U = math.floor((W + B) / 2)
+
+    constraints = []
+    for t in range(1, n + 1):
+        constraints += at_most_k(H[t], U, name=f"home_le_t{t}_U{U}")
+        constraints += at_most_k([z3.Not(h) for h in H[t]], W - L, name=f"home_ge_t{t}_L{L}")
+    return constraints
+
+
+def model_imbalance(z3_model: z3.ModelRef, H: list, n: int) -> int:
+    """
+    Max-imbalance max_t |2 * home_count[t] - W| achieved by a model.
+    """
+    W = n - 1
+    worst = 0
+    for t in range(1, n + 1):
+        home_count = sum(z3.is_true(z3_model.eval(h, model_completion=True)) for h in H[t])
+        worst = max(worst, abs(2 * home_count - W))
+    return worst
+
 
 def optimise_rr(n: int,
                        rr_tuple: tuple,
                        timeout_sec: int = 300) -> tuple[int | None, z3.ModelRef | None]:
     """
-    Minimize max-imbalance via binary search using weekly home literals H.
+    Minimize max-imbalance using weekly home literals H.
     rr_tuple is (solver, pos, swap, Home, Away, H).
-    For a bound B, enforce:
-        L = ceil((W-B)/2)  <=  home_count[t]  <=  U = floor((W+B)/2)
-    encoded via at_most_k on H[t,*] and on ~H[t,*].
+    For few weeks (W <= LINEAR_THRESHOLD) the bound is tightened linearly on a
+    single solver, otherwise it is found via binary search under assumptions.
+    The bound constraints are added to the model's own solver, which is
+    therefore modified in place.
     """
-    from math import ceil, floor
-
     solver, pos, swap, Home, Away, H = rr_tuple
     assert H is not None, "SATModelRR must be built with optimization=True to get H"
 
     W = n - 1
-    base_assertions = list(solver.assertions())
-
-    lo, hi = 0, W
     best_val, best_model = None, None
-    start_time = time.time()
-
+    deadline_ns = time.monotonic_ns() + timeout_sec * 1_000_000_000
+
+    if W <= LINEAR_THRESHOLD:
+        # Tighter bounds imply looser ones, so the solver only ever gains
+        # constraints: solve, then demand strictly better than the model
+        while True:
+            remaining_ms = (deadline_ns - time.monotonic_ns()) // 1_000_000
+            if remaining_ms <= 0:
+                break
+
+            solver.set("timeout", remaining_ms)
+            if solver.check() != z3.sat:
+                break
+
+            best_model = solver.model()
+            best_val = model_imbalance(best_model, H, n)
+            if best_val == 0:
+                break
+            solver.add(*imbalance_constraints(H, n, best_val - 1))
+
+        return best_val, best_model
+
+    # Binary search: each bound is guarded by its own literal and enabled
+    # through assumptions, so learned clauses carry over between steps
+    lo, hi = 0, W
     while lo <= hi:
         # budget
-        elapsed = time.time() - start_time
-        remaining = timeout_sec - elapsed
-        if remaining <= 0:
+        remaining_ms = (deadline_ns - time.monotonic_ns()) // 1_000_000
+        if remaining_ms <= 0:
             break
 
         mid = (lo + hi) // 2
-        L = ceil((W - mid) / 2)
-        U = floor((W + mid) / 2)
-
-        s = z3.Solver()
-        s.set("timeout", int(remaining * 1000))
-        s.add(base_assertions)
 
         # per–team bounds
-        for t in range(1, n + 1):
-            s.add(*at_most_k(H[t], U, name=f"home_le_t{t}_U{U}"))
-            s.add(*at_most_k([z3.Not(h) for h in H[t]], W - L, name=f"home_ge_t{t}_L{L}"))
+        guard = z3.Bool(f"imbalance_le_{mid}")
+        solver.add(*[z3.Implies(guard, c) for c in imbalance_constraints(H, n, mid)])
 
-        res = s.check()
+        solver.set("timeout", remaining_ms)
+        res = solver.check(guard)
         if res == z3.sat:
-            best_val = mid
-            best_model = s.model()
-            hi = mid - 1
+            best_model = solver.model()
+            best_val = model_imbalance(best_model, H, n)
+            hi = best_val - 1
         elif res == z3.unsat:
+            if len(solver.unsat_core()) == 0:
+                # infeasible regardless of the bound
+                break
             lo = mid + 1
         else:
             break
@@ -80,50 +157,134 @@ def optimise_rr(n: int,
     return best_val, best_model
 
 
-def parse_variable_mappings(dimacs_lines: list[str]) -> dict[str, int]:
+def parse_dimacs(dimacs_str: str) -> tuple[list[list[int]], dict[str, int]]:
     """
-    Build a map from variable name (as created in Z3) to DIMACS id.
+    Read a DIMACS string in a single pass over its lines.
+    Returns: (clauses, varmap), the 0-terminated clause lines as integer
+    lists and the "c <id> <name>" comments as a name -> DIMACS id map.
+    Lines are sliced one at a time at newline offsets, so no copy of the
+    whole text (a line list or a StringIO buffer) is ever built.
     """
+    clauses = []
     varmap = {}
-    for line in dimacs_lines:
-        if line.startswith('c '):
-            parts = line.strip().split()
-            if len(parts) >= 3:
-                dimacs_id = int(parts[1])
-                var_name = parts[2]
-                varmap[var_name] = dimacs_id
-    return varmap
+    pos, end = 0, len(dimacs_str)
+    while pos < end:
+        eol = dimacs_str.find('\n', pos)
+        if eol == -1:
+            eol = end
+        line = dimacs_str[pos:eol]
+        pos = eol + 1
+        if not line or line.isspace() or line[0] == 'p':
+            continue
+        if line[0] == 'c':
+            parts = line.split()
+            if len(parts) == 3:
+                varmap[parts[2]] = int(parts[1])
+            continue
+        clauses.append([int(lit) for lit in line.split()[:-1]])
+    return clauses, varmap
 
 
 # ----------------------------------------------------------
 # Utility: convert Z3 constraints to DIMACS CNF
 # ----------------------------------------------------------
-def z3solver_to_dimacs(solver: z3.Solver):
+def z3solver_to_dimacs(solver: z3.Solver) -> str:
     """
-    Convert a Z3 solver's assertions into a CNF usable by PySAT.
+    Convert a Z3 solver's assertions into a DIMACS string
+    (with "c <id> <name>" comments for the named variables).
     """
     goal = z3.Goal()
     goal.add(solver.assertions())
 
-    tactic = z3.Then(z3.Tactic("simplify"), z3.Tactic("tseitin-cnf"))
-
-    result = tactic(goal)
+    result = _CNF_TACTIC(goal)
 
     if len(result) == 0:
         raise ValueError("Z3 did not produce any CNF clauses.")
 
-    dimacs_str = result[0].dimacs()
-    dimacs_lines = dimacs_str.splitlines()
+    return result[0].dimacs()
+
+
+def cnf_cache_key(model: str, n: int, use_symmetry_breaking: bool, optimization: bool = False) -> str:
+    """
+    Cache key of a CNF: the model parameters, the tactic configuration and
+    the encoding sources (so editing an encoding invalidates the cache).
+    """
+    key = hashlib.sha1(
+        f"{model}|{n}|{use_symmetry_breaking}|{optimization}|{_SIMPLIFY_PARAMS}|{_TSEITIN_PARAMS}".encode()
+    )
+    for src in ENCODING_SOURCES:
+        key.update(src.read_bytes())
+    return key.hexdigest()
+
+
+def build_decision_solver(model: str, n: int, use_symmetry_breaking: bool) -> z3.Solver:
+    """
+    Z3 solver holding the HA/RR decision encoding.
+    """
+    if model == "ha":
+        return SATModelHA.build_solver(n, use_symmetry_breaking)
+    elif model == "rr":
+        return SATModelRR.build_solver(
+            n,
+            optimization=False,
+            use_symmetry_breaking_constraints=use_symmetry_breaking
+        )[0]
+    raise ValueError(f"Unknown model: {model}")
+
+
+@lru_cache(maxsize=None)
+def build_decision_cnf(model: str, n: int, use_symmetry_breaking: bool):
+    """
+    CNF clauses and varmap of the HA/RR decision encoding.
+    Returns: (clauses, varmap), shared between calls: do not mutate.
+    Memoized in-process and pickled on disk: on a hit neither the Z3 model
+    nor the tactic pipeline is built, and no DIMACS text is parsed.
+    """
+    key = cnf_cache_key(model, n, use_symmetry_breaking)
+    cache_path = CNF_CACHE_DIR / f"{key}.pkl"
+
+    if cache_path.exists():
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    dimacs_str = z3solver_to_dimacs(build_decision_solver(model, n, use_symmetry_breaking))
+    clauses, varmap = parse_dimacs(dimacs_str)
 
-    # Build varmap from DIMACS comments
-    varmap = parse_variable_mappings(dimacs_lines)
+    # Persist the conversion for later runs
+    os.makedirs(CNF_CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump((clauses, varmap), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
 
-    # Build CNF object from DIMACS string
-    return CNF(from_string=dimacs_str), varmap
+    return clauses, varmap
 
 # ----------------------------------------------------------
 # Parse decision output from PySAT
 # ----------------------------------------------------------
+# Literal kinds in the decode table
+_KIND_NONE, _KIND_H, _KIND_A, _KIND_POS = 0, 1, 2, 3
+
+
+def decode_table(varmap: dict[str, int]) -> np.ndarray:
+    """
+    Invert the varmap into a table indexed by DIMACS id, in one pass.
+    Row id holds (kind, a, b, c): (H/A, period, week, team) for HA literals,
+    (POS, week, period, match) for RR literals, kind NONE for auxiliaries.
+    """
+    table = np.zeros((max(varmap.values(), default=0) + 1, 4), dtype=np.int32)
+    for name, dimacs_id in varmap.items():
+        match = _HA_VAR_RE.match(name)
+        if match:
+            kind, a, b, c = match.groups()
+            table[dimacs_id] = (_KIND_H if kind == 'H' else _KIND_A, int(a), int(b), int(c))
+            continue
+        match = _RR_POS_RE.match(name)
+        if match:
+            table[dimacs_id] = (_KIND_POS, *map(int, match.groups()))
+    return table
+
+
 def parse_decision_output(model_values: list[int],
                           model: str,
                           n: int,
@@ -134,44 +295,45 @@ def parse_decision_output(model_values: list[int],
     Parse PySAT model (list of true literals) into a schedule matrix.
     Returns: schedule[p][w] = [home_team, away_team].
     """
-    model_set = set(v for v in model_values if v > 0)
     W = n - 1
     P = n // 2
-    schedule = [[0 for _ in range(W)] for _ in range(P)]
+    table = decode_table(varmap)
+
+    # Decode every true literal at once: (kind, a, b, c) per true id
+    lits = np.asarray(model_values, dtype=np.int32)
+    true_ids = lits[(lits > 0) & (lits < len(table))]
+    kind, a, b, c = table[true_ids].T
 
     if model == 'ha':
-        # For each period and week, find exactly one home and one away
-        for p in range(P):
-            for w in range(W):
-                home_team = None
-                away_team = None
-                for t in range(n):
-                    hid = varmap.get(f"H_{p+1}_{w+1}_{t+1}")
-                    aid = varmap.get(f"A_{p+1}_{w+1}_{t+1}")
-                    if hid is not None and hid in model_set and home_team is None:
-                        home_team = t + 1
-                    if aid is not None and aid in model_set and away_team is None:
-                        away_team = t + 1
-                    if home_team is not None and away_team is not None:
-                        break
-                if home_team is None or away_team is None:
-                    raise RuntimeError(f"Missing assignment for period={p+1}, week={w+1}")
-                schedule[p][w] = [home_team, away_team]
-
-    elif model == 'rr':
-        for p in range(P):
-            for w in range(W):
-                chosen_k = None
-                for k in range(P):
-                    lit_id = varmap.get(f"pos_{w+1}_{p+1}_{k+1}")
-                    if lit_id is not None and lit_id in model_set:
-                        chosen_k = k
-                        break
-                if chosen_k is None:
-                    raise RuntimeError(f"No true pos var for week={w+1}, period={p+1}")
-                schedule[p][w] = [Home[w][chosen_k], Away[w][chosen_k]]
+        # Scatter the true H/A literals into schedule[p, w, side] = team
+        schedule = np.zeros((P, W, 2), dtype=np.int32)
+        for side, side_kind in enumerate((_KIND_H, _KIND_A)):
+            sel = kind == side_kind
+            schedule[a[sel] - 1, b[sel] - 1, side] = c[sel]
 
-    return schedule
+        missing = (schedule == 0).any(axis=2)
+        if missing.any():
+            p, w = np.argwhere(missing)[0]
+            raise RuntimeError(f"Missing assignment for period={p+1}, week={w+1}")
+        return schedule.tolist()
+
+    if model == 'rr':
+        # Scatter the true pos literals into chosen_k[w, p] = match index
+        sel = kind == _KIND_POS
+        chosen_k = np.full((W, P), -1, dtype=np.int32)
+        chosen_k[a[sel] - 1, b[sel] - 1] = c[sel] - 1
+
+        missing = chosen_k < 0
+        if missing.any():
+            w, p = np.argwhere(missing)[0]
+            raise RuntimeError(f"No true pos var for week={w+1}, period={p+1}")
+
+        # Read the chosen match of every (w, p) from the tables in one gather
+        home = np.take_along_axis(np.asarray(Home), chosen_k, axis=1)
+        away = np.take_along_axis(np.asarray(Away), chosen_k, axis=1)
+        return np.stack([home.T, away.T], axis=2).tolist()
+
+    raise ValueError(f"Unknown model: {model}")
 
 
 # ----------------------------------------------------------
@@ -187,35 +349,193 @@ def parse_optimization_output(z3_model: z3.ModelRef,
     """
     W = len(pos_vars)       # number of weeks
     P = len(pos_vars[0])    # number of periods per week
-    schedule = []
 
+    # Read the true pos/swap literals with a single walk over the model
+    # declarations instead of evaluating every pos_vars[w][p][k]
+    chosen_k = {}
+    swapped = set()
+    for decl in z3_model.decls():
+        name = decl.name()
+        match = _RR_POS_RE.match(name)
+        if match:
+            if z3.is_true(z3_model[decl]):
+                w, p, k = (int(g) - 1 for g in match.groups())
+                chosen_k[(w, p)] = k
+            continue
+        match = _RR_SWAP_RE.match(name)
+        if match and z3.is_true(z3_model[decl]):
+            w, p = (int(g) - 1 for g in match.groups())
+            swapped.add((w, p))
+
+    schedule = []
     for p in range(P):
         period_matches = []
         for w in range(W):
             # find which match index k is selected
-            chosen_k = None
-            for k in range(P):
-                if z3.is_true(z3_model.eval(pos_vars[w][p][k])):
-                    chosen_k = k
-                    break
-            if chosen_k is None:
+            k = chosen_k.get((w, p))
+            if k is None:
                 raise RuntimeError(f"No valid match found for week {w+1}, period {p+1}")
 
             # check if swap is active
-            swapped = z3.is_true(z3_model.eval(swap_vars[w][p]))
-            if swapped:
-                home, away = Away[w][chosen_k], Home[w][chosen_k]
+            if (w, p) in swapped:
+                home, away = Away[w][k], Home[w][k]
             else:
-                home, away = Home[w][chosen_k], Away[w][chosen_k]
+                home, away = Home[w][k], Away[w][k]
 
             period_matches.append([home, away])
         schedule.append(period_matches)
     return schedule
 
+# ----------------------------------------------------------
+# Solver interruption
+# ----------------------------------------------------------
+@contextlib.contextmanager
+def interrupt_after(sat_solver, timeout: float):
+    """
+    Interrupt a PySAT solver (solve_limited with expect_interrupt=True)
+    once `timeout` seconds have elapsed.
+    A watchdog thread is required: while the calling thread runs inside the
+    solver's C code no Python signal handler (e.g. SIGALRM) gets to run.
+    """
+    timer = Timer(timeout, sat_solver.interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        # Cancel timer if finished early
+        timer.cancel()
+
+# ----------------------------------------------------------
+# Parallel solving: solver portfolio and cube-and-conquer
+# ----------------------------------------------------------
+# CNF clauses shared by the pool workers (set once per worker process)
+_worker_clauses = None
+
+
+def _init_worker(clauses: list[list[int]]):
+    global _worker_clauses
+    _worker_clauses = clauses
+
+
+def _solve_task(task: tuple[str, list[int]], deadline: float):
+    """
+    Solve the shared CNF with one (solver_name, cube) task,
+    the cube literals being passed as assumptions.
+    deadline is absolute (time.monotonic()), shared by every task: a task
+    queued behind busy workers only gets what is left of the budget, and
+    none at all once it has run out.
+    """
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        return None
+    solver_name, cube = task
+    with PYSAT_SOLVERS[solver_name](bootstrap_with=_worker_clauses) as sat_solver:
+        with interrupt_after(sat_solver, timeout):
+            sat = sat_solver.solve_limited(assumptions=cube, expect_interrupt=True)
+        return sat_solver.get_model() if sat else None
+
+
+def rr_cubes(varmap: dict[str, int], n: int) -> list[list[int]] | None:
+    """
+    Split the RR search space on the match placed at (week 2, period 1):
+    the one-hot pos_2_1_* literals give P disjoint cubes covering all models.
+    Returns None if the split is not available.
+    """
+    P = n // 2
+    names = [f"pos_2_1_{k + 1}" for k in range(P)]
+    if n < 4 or any(name not in varmap for name in names):
+        return None
+    return [[varmap[name]] for name in names]
+
+
+def solve_in_pool(clauses: list[list[int]],
+                  solver_names: list[str],
+                  cubes: list[list[int]],
+                  deadline: float) -> list[int] | None:
+    """
+    Run every (solver, cube) combination in a process pool; the first model
+    found wins. Several solvers on the empty cube form a portfolio, one
+    solver on several cubes is cube-and-conquer.
+    deadline (time.monotonic()) bounds the whole pool, start-up included.
+    Returns None if every task is UNSAT or interrupted.
+    """
+    tasks = [(solver_name, cube) for cube in cubes for solver_name in solver_names]
+    workers = min(len(tasks), os.cpu_count() or 1)
+    solve = partial(_solve_task, deadline=deadline)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(clauses,)) as pool:
+        for model_values in pool.imap_unordered(solve, tasks):
+            if model_values is not None:
+                # leaving the pool terminates the remaining workers
+                return model_values
+    return None
+
+# ----------------------------------------------------------
+# PySAT backend: solve the exported DIMACS
+# ----------------------------------------------------------
+def solve_with_pysat(model: str, solver_name: str, n: int, use_symmetry_breaking: bool, timeout: int,
+                     cube: bool = False):
+    """
+    Solve the decision CNF with one PySAT solver, a portfolio of them
+    ("portfolio") and/or cube-and-conquer (RR only).
+    Returns: (model_values, varmap); model_values is None if UNSAT or timed out.
+    """
+    # CNF from the cache or freshly encoded; the solver gets what is left
+    # of the budget so that build + solve stays within the timeout
+    deadline = time.monotonic() + timeout
+    clauses, varmap = build_decision_cnf(model, n, use_symmetry_breaking)
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        return None, varmap
+
+    # Choose backend(s): "portfolio" races every PySAT solver
+    solver_names = list(PYSAT_SOLVERS) if solver_name == "portfolio" else [solver_name]
+
+    cubes = rr_cubes(varmap, n) if cube and model == "rr" else None
+    if cubes or len(solver_names) > 1:
+        return solve_in_pool(clauses, solver_names, cubes or [[]], deadline), varmap
+
+    with PYSAT_SOLVERS[solver_names[0]](bootstrap_with=clauses) as sat_solver:
+        # Interrupt after timeout seconds
+        with interrupt_after(sat_solver, timeout):
+            sat = sat_solver.solve_limited(expect_interrupt=True)
+        return (sat_solver.get_model() if sat else None), varmap
+
+# ----------------------------------------------------------
+# Z3 backend: solve the encoding natively, no DIMACS export
+# ----------------------------------------------------------
+def solve_with_z3(model: str, n: int, use_symmetry_breaking: bool, timeout: int):
+    """
+    Solve the decision encoding with Z3's own (parallel) SAT core.
+    Returns: (model_values, varmap) in the PySAT shape, numbering the model's
+    Boolean constants 1..k, so that parse_decision_output can decode them.
+    model_values is None if UNSAT or timed out.
+    """
+    z3.set_param('parallel.enable', True)
+    z3.set_param('parallel.threads.max', os.cpu_count() or 1)
+
+    build_start = time.time()
+    solver = build_decision_solver(model, n, use_symmetry_breaking)
+    # Z3 timeout is in milliseconds; only the budget left after the build
+    remaining_ms = int((timeout - (time.time() - build_start)) * 1000)
+    if remaining_ms <= 0:
+        return None, {}
+    solver.set("timeout", remaining_ms)
+    if solver.check() != z3.sat:
+        return None, {}
+
+    z3_model = solver.model()
+    varmap, model_values = {}, []
+    for var_id, decl in enumerate(z3_model.decls(), start=1):
+        varmap[decl.name()] = var_id
+        model_values.append(var_id if z3.is_true(z3_model[decl]) else -var_id)
+    return model_values, varmap
+
 # ----------------------------------------------------------
 # Core solving routine
 # ----------------------------------------------------------
-def solve_sat_instance(model, solver_name, n_value, use_symmetry_breaking, optimization, test_name, timeout=300):
+def solve_sat_instance(model, solver_name, n_value, use_symmetry_breaking, optimization, test_name, timeout=300,
+                       cube=False, backend="pysat"):
     start_time = time.time()
 
     # Optimization mode only valid for RR
@@ -252,41 +572,14 @@ def solve_sat_instance(model, solver_name, n_value, use_symmetry_breaking, optim
         }
 
 
-    # Decision mode (HA or RR)
-    if model.lower() == "ha":
-        solver = SATModelHA.build_solver(n_value, use_symmetry_breaking)
-        # Initialize RR-specific variables to None for consistency
-        pos, Home, Away = None, None, None
-    elif model.lower() == "rr":
-        solver, pos, _, Home, Away, _ = SATModelRR.build_solver(
-            n_value,
-            optimization=False,
-            use_symmetry_breaking_constraints=use_symmetry_breaking
-        )
-        
-    else:
-        raise ValueError(f"Unknown model: {model}")
-
-    # Convert to CNF
-    cnf, varmap = z3solver_to_dimacs(solver)
-
-    # Choose backend
-    pysat_cls = Minisat22 if solver_name.lower() == "minisat" else Glucose42
-
-    with pysat_cls(bootstrap_with=cnf.clauses) as sat_solver:
-        # Create a timer to interrupt after timeout seconds
-        def interrupt_solver(s):
-            s.interrupt()
-
-        timer = Timer(timeout, interrupt_solver, [sat_solver])
-        timer.start()
-
-        # Use solve_limited with expect_interrupt=True
-        sat = sat_solver.solve_limited(expect_interrupt=True)
-        model_values = sat_solver.get_model() if sat else None
+    # RR decoding only needs the precomputed match tables
+    Home, Away = match_tables(n_value) if model.lower() == "rr" else (None, None)
 
-        # Cancel timer if finished early
-        timer.cancel()
+    if backend == "z3":
+        model_values, varmap = solve_with_z3(model.lower(), n_value, use_symmetry_breaking, timeout)
+    else:
+        model_values, varmap = solve_with_pysat(model.lower(), solver_name.lower(), n_value,
+                                                use_symmetry_breaking, timeout, cube)
 
     elapsed_time = time.time() - start_time
 
@@ -325,7 +618,8 @@ def solve_sat_instance(model, solver_name, n_value, use_symmetry_breaking, optim
 def main():
     parser = argparse.ArgumentParser(description="SAT-InstanceSolver: run SAT models with Minisat or Glucose")
     parser.add_argument("model", choices=["ha", "rr"], help="Use HA or RR encoding")
-    parser.add_argument("solver_name", choices=["minisat", "glucose"], help="Underlying SAT solver")
+    parser.add_argument("solver_name", choices=[*PYSAT_SOLVERS, "portfolio"],
+                        help="Underlying SAT solver (portfolio races all of them)")
     parser.add_argument("instance_path", type=pathlib.Path, help="Path to .dzn instance")
     parser.add_argument("use_symmetry_breaking", type=lambda x: x.lower() == 'true',
                         help="True/False for HA symmetry breaking")
@@ -333,12 +627,16 @@ def main():
                         help="True/False for optimization (RR only)")
     parser.add_argument("test_name", type=str, help="Name for the test (used as JSON key)")
     parser.add_argument("-t", "--timeout", type=int, default=300, help="Timeout in seconds")
+    parser.add_argument("--backend", choices=["pysat", "z3"], default="pysat",
+                        help="Solve the decision CNF with PySAT, or natively with Z3's parallel SAT core "
+                             "(solver_name is then ignored)")
+    parser.add_argument("--cube", action="store_true",
+                        help="Cube-and-conquer the RR decision problem over a process pool")
     args = parser.parse_args()
 
-    # Extract n from instance
-    with open(args.instance_path, 'r') as f:
-        content = f.read()
-        match = re.search(r'n\s*=\s*(\d+);', content)
+    # Extract n from the head of the instance (raw bytes, no decoding)
+    with open(args.instance_path, 'rb') as f:
+        match = _N_RE.search(f.read(4096))
         if not match:
             raise ValueError("Could not find 'n' in instance file.")
         n_value = int(match.group(1))
@@ -351,30 +649,16 @@ def main():
         args.use_symmetry_breaking,
         args.optimization,
         args.test_name,
-        args.timeout
+        args.timeout,
+        args.cube,
+        args.backend
     )
 
-    # Save JSON
-    res_dir = pathlib.Path(__file__).parent.parent.parent / "res" / "SAT"
-    os.makedirs(res_dir, exist_ok=True)
+    # Append the result to the instance log (merged by compact_results.py)
     instance_id = os.path.splitext(os.path.basename(args.instance_path))[0]
-    res_path = os.path.join(res_dir, f"{instance_id}.json")
-
-    data = {}
-    if os.path.exists(res_path):
-        with open(res_path, 'r') as f:
-            data = json.load(f)
-
-    data.update(result)
-
-    opts = jsbeautifier.default_options()
-    opts.keep_array_indentation = True
-    beautified = jsbeautifier.beautify(json.dumps(data), opts)
-
-    with open(res_path, 'w') as f:
-        f.write(beautified)
+    log_path = append_result(instance_id, result)
 
-    print(f"  Result saved to: {res_path}")
+    print(f"  Result appended to: {log_path}")
     return 0
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from typing import List
-from z3 import Solver, Int, And, Or, If, Distinct, Sum
+from z3 import Solver, BoolVal, Int, Bool, And, Or, If, Distinct, Sum, PbEq, PbLe
 
 #====================================================================
 # Helper: deterministic array read over a constant Python list
@@ -9,9 +9,10 @@ def lex_less_seq(X: List[Int], Y: List[Int]):
         Returns True if X < Y in lexicographic order.
     """
     terms = []
+    prefix_eq = BoolVal(True)          # X[:k] == Y[:k], extended one position per step
     for k in range(len(X)):
-        prefix_eq = And(*[X[i] == Y[i] for i in range(k)]) if k > 0 else True
         terms.append(And(prefix_eq, X[k] < Y[k]))
+        prefix_eq = And(prefix_eq, X[k] == Y[k])
     return Or(*terms)
 
 
@@ -19,8 +20,11 @@ class SMTModelHA:
     @staticmethod
     def build_solver(
         n: int,
-        use_symmetry_breaking_constraints: bool
-    ) -> tuple[Solver, List[List[Int]], List[List[Int]], int, int]:
+        use_symmetry_breaking_constraints: bool,
+        use_pseudo_boolean: bool = False
+    ) -> tuple[Solver, List[List[Int]], List[List[Int]]]:
+        # use_pseudo_boolean: cardinalities as native PbEq/PbLe atoms instead of
+        # Sum(If(...)); Z3 only (the pbeq/pble terms are not standard SMT-LIB)
         #====================================================================
         # INSTANCE PARAMETER
         #====================================================================
@@ -42,6 +46,16 @@ class SMTModelHA:
             for p in range(P)
         ]
 
+        # Channeling Booleans: hEq[p][w][t-1] ⇔ Home[p][w] == t (aEq for Away)
+        hEq: List[List[List[Bool]]] = [
+            [[Bool(f"hEq_{p + 1}_{w + 1}_{t}") for t in range(1, n + 1)] for w in range(W)]
+            for p in range(P)
+        ]
+        aEq: List[List[List[Bool]]] = [
+            [[Bool(f"aEq_{p + 1}_{w + 1}_{t}") for t in range(1, n + 1)] for w in range(W)]
+            for p in range(P)
+        ]
+
 
         #====================================================================
         # CONSTRAINTS
@@ -52,6 +66,13 @@ class SMTModelHA:
                 solver.add(And(1 <= Home[p][w], Home[p][w] <= n))
                 solver.add(And(1 <= Away[p][w], Away[p][w] <= n))
 
+        #--- Channeling: one Boolean per (slot, team) value
+        for p in range(P):
+            for w in range(W):
+                for t in range(1, n + 1):
+                    solver.add(hEq[p][w][t - 1] == (Home[p][w] == t))
+                    solver.add(aEq[p][w][t - 1] == (Away[p][w] == t))
+
         #--- Main constraint: every unordered pair {i,j} occurs exactly once
         pair_codes = []
         for p in range(P):
@@ -60,7 +81,13 @@ class SMTModelHA:
                 mn = If(h < a, h, a)
                 mx = If(h < a, a, h)
                 pair_codes.append(mn * n + mx)
-        solver.add(Distinct(*pair_codes))
+        # each of the C(n,2) possible codes is taken by exactly one slot
+        valid_codes = [i * n + j for i in range(1, n) for j in range(i + 1, n + 1)]
+        for c in valid_codes:
+            if use_pseudo_boolean:
+                solver.add(PbEq([(code == c, 1) for code in pair_codes], 1))
+            else:
+                solver.add(Sum([If(code == c, 1, 0) for code in pair_codes]) == 1)
 
         #--- Main constraint: each team plays exactly once per week
         for w in range(W):
@@ -70,8 +97,11 @@ class SMTModelHA:
         #--- Main constraint: each team appears in the same period at most twice
         for p in range(P):
             for t in range(1, n + 1):
-                occs = [If(Home[p][w] == t, 1, 0) + If(Away[p][w] == t, 1, 0) for w in range(W)]
-                solver.add(Sum(occs) <= 2)
+                occs = [hEq[p][w][t - 1] for w in range(W)] + [aEq[p][w][t - 1] for w in range(W)]
+                if use_pseudo_boolean:
+                    solver.add(PbLe([(b, 1) for b in occs], 2))
+                else:
+                    solver.add(Sum([If(b, 1, 0) for b in occs]) <= 2)
 
         #====================================================================
         # SYMMETRY BREAKING
@@ -99,4 +129,4 @@ class SMTModelHA:
                 Yw = [Away[p][w + 1] for p in range(P)] + [Home[p][w + 1] for p in range(P)]
                 solver.add(lex_less_seq(Xw, Yw))
 
-        return solver
+        return solver, Home, Away
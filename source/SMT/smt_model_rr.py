@@ -1,37 +1,68 @@
+from functools import lru_cache
 from typing import List, Union, Optional
-from z3 import Solver, Optimize, Int, Bool, IntVal, And, Or, If, Distinct, Sum, Abs, Not
+from z3 import Solver, BoolVal, Optimize, Int, Bool, IntVal, And, Or, If, Sum, Abs, Not, PbLe
 
 #====================================================================
 # Helper: deterministic array read over a constant Python list
 #====================================================================
-def select_const(values: List[int], idx: Int) -> Int:
+def select_const(values: List[int], onehot: List[Bool]) -> Int:
     """
-    Read values[idx] for 1-based idx ∈ {1..len(values)} using a nested If-chain.
+    Read values[k] for the single k whose one-hot literal onehot[k] is true.
     """
-    expr = IntVal(values[-1])          # default/else branch
-    for k in range(len(values) - 2, -1, -1):
-        expr = If(idx == k + 1, IntVal(values[k]), expr)
-    return expr
+    return Sum(*[If(b, IntVal(v), 0) for b, v in zip(onehot, values)])
+
+def select_eq(values: List[int], onehot: List[Bool], t: int):
+    """
+    values[k] == t for the k selected by the one-hot: the disjunction of the
+    literals onehot[k] with values[k] == t (False if t does not occur).
+    """
+    lits = [b for b, v in zip(onehot, values) if v == t]
+    return Or(*lits) if lits else BoolVal(False)
+
+def exactly_one(lits: List[Bool]):
+    """ Exactly one literal true (at-least-one + pairwise at-most-one). """
+    return And(Or(*lits), *[Or(Not(lits[i]), Not(lits[j]))
+                            for i in range(len(lits)) for j in range(i + 1, len(lits))])
 
 def lex_less_seq(X: List[Int], Y: List[Int]):
     """ Strict lexicographic comparison of two sequences X and Y.
         Returns True if X < Y in lexicographic order.
     """
     terms = []
+    prefix_eq = BoolVal(True)          # X[:k] == Y[:k], extended one position per step
     for k in range(len(X)):
-        prefix_eq = And(*[X[i] == Y[i] for i in range(k)]) if k > 0 else True
         terms.append(And(prefix_eq, X[k] < Y[k]))
+        prefix_eq = And(prefix_eq, X[k] == Y[k])
     return Or(*terms)
 
+@lru_cache(maxsize=None)
+def match_tables(n: int) -> tuple[tuple[tuple[int, ...], ...], tuple[tuple[int, ...], ...]]:
+    """
+    Circle-method match tables: A[w][k] vs B[w][k] is the k-th match of week w,
+    canonicalized so that A[w][k] > B[w][k]. They do not depend on the
+    optimization flag, so they are computed once per n and shared (read-only).
+    """
+    W, P = n - 1, n // 2
+    A = [[0] * P for _ in range(W)]
+    B = [[0] * P for _ in range(W)]
+    for w in range(1, W + 1):
+        for p in range(1, P + 1):
+            a_raw = n if p == 1 else ((w - 1) + (p - 1)) % (n - 1) + 1
+            b_raw = w if p == 1 else ((n - 1) - (p - 1) + (w - 1)) % (n - 1) + 1
+            A[w - 1][p - 1] = max(a_raw, b_raw)
+            B[w - 1][p - 1] = min(a_raw, b_raw)
+    return tuple(map(tuple, A)), tuple(map(tuple, B))
+
 class SMTModelRR:
     @staticmethod
     def build_solver(
         n: int,
         optimization: bool,
-        use_symmetry_breaking_constraints: bool
+        use_symmetry_breaking_constraints: bool,
+        use_pseudo_boolean: bool = False
     ) -> tuple[
         Union[Solver, Optimize],
-        List[List[Int]],                   # pos
+        List[List[List[Bool]]],            # pos
         Optional[List[List[Bool]]],        # swap (None if optimization=False)
         List[List[int]],                   # A (precomputed)
         List[List[int]],                   # B (precomputed)
@@ -43,6 +74,8 @@ class SMTModelRR:
         assert n % 2 == 0 and n >= 2, "n must be even and >= 2"
         W = n - 1                          # number of weeks
         P = n // 2                         # number of periods
+        # use_pseudo_boolean: cardinalities as native PbLe atoms instead of
+        # Sum(If(...)); Z3 only (the pble terms are not standard SMT-LIB)
 
         solver = Optimize() if optimization else Solver()
 
@@ -50,21 +83,18 @@ class SMTModelRR:
         # PRECOMPUTED MATCH TABLES (circle method)
         #====================================================================
         # For each week w and match index k, A[w][k] vs B[w][k] defines the pair.
-        # If optimization=False, we canonicalize pairs so A[w][k] ≥ B[w][k].
-        A: List[List[int]] = [[0] * P for _ in range(W)]
-        B: List[List[int]] = [[0] * P for _ in range(W)]
-        for w in range(1, W + 1):
-            for p in range(1, P + 1):
-                a_raw = n if p == 1 else ((w - 1) + (p - 1)) % (n - 1) + 1
-                b_raw = w if p == 1 else ((n - 1) - (p - 1) + (w - 1)) % (n - 1) + 1
-                A[w - 1][p - 1] = max(a_raw, b_raw)
-                B[w - 1][p - 1] = min(a_raw, b_raw)
+        # Pairs are canonicalized (A[w][k] > B[w][k]) in both modes; in
+        # optimization mode swap[w][p] then decides the home side.
+        A, B = match_tables(n)
 
         #====================================================================
         # DECISION VARIABLES
         #====================================================================
-        # pos[w][p] ∈ {1..P} chooses which match index k is placed at (w,p)
-        pos: List[List[Int]] = [[Int(f"pos_{w+1}_{p+1}") for p in range(P)] for w in range(W)]
+        # pos[w][p][k] : one-hot → which match index k is placed at (w,p)
+        pos: List[List[List[Bool]]] = [
+            [[Bool(f"pos_{w+1}_{p+1}_{k+1}") for k in range(P)] for p in range(P)]
+            for w in range(W)
+        ]
 
         # swap[w][p] toggles A↔B at (w,p) (only when optimizing balance)
         swap: Optional[List[List[Bool]]] = (
@@ -75,26 +105,26 @@ class SMTModelRR:
         #====================================================================
         # CONSTRAINTS
         #====================================================================
-        #--- Main constraint: set domains
+        #--- Main constraint: exactly one match index per slot
         for w in range(W):
             for p in range(P):
-                solver.add(And(1 <= pos[w][p], pos[w][p] <= P))
-        
+                solver.add(exactly_one(pos[w][p]))
+
         #--- Main constraint: per-week permutation of match indices
         for w in range(W):
-            solver.add(Distinct(*pos[w]))
+            for k in range(P):
+                solver.add(exactly_one([pos[w][p][k] for p in range(P)]))
 
         #--- Main constraint: each team appears in the same period at most twice
         for p in range(P):
             for t in range(1, n + 1):
-                terms = []
-                for w in range(W):
-                    idx = pos[w][p]
-                    a_val = select_const(A[w], idx)
-                    b_val = select_const(B[w], idx)
-                    terms.append(If(a_val == t, 1, 0))
-                    terms.append(If(b_val == t, 1, 0))
-                solver.add(Sum(*terms) <= 2)
+                # team t plays once per week, on the A or the B side
+                occs = [select_eq(side[w], pos[w][p], t)
+                        for w in range(W) for side in (A, B) if t in side[w]]
+                if use_pseudo_boolean:
+                    solver.add(PbLe([(b, 1) for b in occs], 2))
+                else:
+                    solver.add(Sum(*[If(b, 1, 0) for b in occs]) <= 2)
 
         #====================================================================
         # SYMMETRY BREAKING
@@ -102,7 +132,7 @@ class SMTModelRR:
         if use_symmetry_breaking_constraints:
             #--- Symmetry breaking: fix week 1 to identity permutation
             for p in range(P):
-                solver.add(pos[0][p] == p + 1)
+                solver.add(pos[0][p][p])
                 if swap is not None:
                     solver.add(swap[0][p] == False)
 
@@ -129,21 +159,24 @@ class SMTModelRR:
         if optimization:
             assert swap is not None
             max_imbalance = Int("maxImbalance")
-            solver.add(And(0 <= max_imbalance, max_imbalance <= W))
+            # W is odd, so every |2 * home_count - W| is at least 1
+            solver.add(And(1 <= max_imbalance, max_imbalance <= W))
+
+            # home[t][w] ⇔ team t plays at home in week w (it plays once per week)
+            home = [[Bool(f"home_{t}_{w+1}") for w in range(W)] for t in range(1, n + 1)]
+            for t in range(1, n + 1):
+                for w in range(W):
+                    # A at home if not swapped; B at home if swapped
+                    solver.add(home[t - 1][w] == Or(*[
+                        Or(And(select_eq(A[w], pos[w][p], t), Not(swap[w][p])),
+                           And(select_eq(B[w], pos[w][p], t),     swap[w][p]))
+                        for p in range(P)
+                    ]))
 
             # home_count[t] = number of weeks where team t is at home
             home_count = [Int(f"home_{t}") for t in range(1, n + 1)]
             for t, hc in enumerate(home_count, start=1):
-                terms = []
-                for w in range(W):
-                    for p in range(P):
-                        idx = pos[w][p]
-                        a_val = select_const(A[w], idx)
-                        b_val = select_const(B[w], idx)
-                        # A at home if not swapped; B at home if swapped
-                        terms.append(If(And(a_val == t, Not(swap[w][p])), 1, 0))
-                        terms.append(If(And(b_val == t,     swap[w][p]), 1, 0))
-                solver.add(hc == Sum(*terms))
+                solver.add(hc == Sum(*[If(home[t - 1][w], 1, 0) for w in range(W)]))
 
             # maxImbalance ≥ |2 * home_count[t] - W| for all teams
             for hc in home_count:
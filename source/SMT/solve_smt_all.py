@@ -3,11 +3,11 @@
 Batch SMT Solver: Script to run multiple SMT instances automatically.
 """
 import json
-import os
+import argparse
 import pathlib
-import subprocess
-import sys
-import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from solve_smt_instance import read_n, solve_smt_instance, write_results
 
 # Define paths for instances and results
 instances_path = pathlib.Path(__file__).parent.parent.parent / 'instances' / 'SMT'
@@ -39,6 +39,12 @@ EXPERIMENTS_CONFIG = {
         'use_symmetry_breaking': 'false',
         'optimization': 'false',
     },
+    'ha-portfolio': {
+        'model': 'ha',
+        'smt_solver': 'portfolio',
+        'use_symmetry_breaking': 'true',
+        'optimization': 'false',
+    },
 
     # Experiments with Round-Robin method
     'rr-z3': {
@@ -80,21 +86,49 @@ EXPERIMENTS_CONFIG = {
 }
 
 
+# Per-experiment timeout in seconds (the solvers' default)
+TIMEOUT = 300
+
+
+def check_experiments_config():
+    """
+    Fail fast on a malformed experiment before any instance is solved.
+    """
+    for exp_name, config in EXPERIMENTS_CONFIG.items():
+        missing = {'model', 'smt_solver', 'use_symmetry_breaking', 'optimization'} - config.keys()
+        if missing:
+            raise ValueError(f"Experiment '{exp_name}' is missing keys: {sorted(missing)}")
+        if config['model'] not in ('ha', 'rr') or config['smt_solver'] not in ('z3', 'cvc5', 'portfolio'):
+            raise ValueError(f"Experiment '{exp_name}' has an unknown model or solver")
+
+
 def main():
-    # Find all .txt files in the instances directory
-    instance_files = glob.glob(os.path.join(instances_path, "*.txt"))
+    parser = argparse.ArgumentParser(description="Batch SMT Solver: run every SMT experiment on every instance")
+    parser.add_argument("--cpu-budget", type=int, default=None,
+                        help="Cores this runner may use: experiments run concurrently on up to N worker processes "
+                             "and the cores they leave free go to Z3's parallel mode "
+                             "(default: one experiment at a time, one Z3 thread)")
+    args = parser.parse_args()
+
+    check_experiments_config()
+
+    # Find all .txt files in the instances directory, in instance order
+    instance_files = sorted(instances_path.glob("*.txt"), key=lambda p: int(p.stem))
 
     if not instance_files:
         print(f"No .txt files found in {instances_path}")
         return 1
 
-    # Sort files for consistent ordering
-    instance_files.sort()
+    # Results of every instance, loaded in one pass over the results directory
+    results_cache = {
+        int(p.stem): json.loads(p.read_text())
+        for p in res_dir.glob("*.json") if p.stem.isdigit()
+    }
 
     # Process each instance
     for i, instance_file in enumerate(instance_files):
         # Extract instance_id from filename
-        instance_id = os.path.splitext(os.path.basename(instance_file))[0]
+        instance_id = int(instance_file.stem)
 
         # Header for new instance
         print(f"\n{'=' * 80}")
@@ -102,79 +136,79 @@ def main():
             f"INSTANCE: {instance_id:<40} | PROGRESS: [{i + 1:>3}/{len(instance_files):<3}]")
         print(f"{'=' * 80}")
 
-        # Read the results obtained from the previous instance
-        prev_instance_id = int(instance_id) - 1
+        # Results obtained from the previous instance
+        prev_instance_id = instance_id - 1
         prev_instance_data = None
         if prev_instance_id > 0:
-            prev_res_path = os.path.join(res_dir, f'{prev_instance_id}.json')
-            try:
-                with open(prev_res_path) as f:
-                    prev_instance_data = json.load(f)
-            except Exception as e:
-                print(f"  WARNING: Could not read previous results for {prev_instance_id}: {e}")
-                raise e
-
-        # Iterate over each defined experiment
-        for exp_idx, exp_name in enumerate(EXPERIMENTS_CONFIG.keys()):
-            print(f"\n  EXPERIMENT: {exp_name:<35} [{exp_idx + 1}/{len(EXPERIMENTS_CONFIG)}]")
-            print(f"  {'─' * 60}")
-
-            # Check if we should skip this experiment based on previous results
-            if prev_instance_data and exp_name not in prev_instance_data:
-                raise KeyError(f"Experiment key '{exp_name}' missing in previous results for {prev_instance_id}")
-            if prev_instance_data and len(prev_instance_data[exp_name]['sol']) == 0:
-                print("  SKIP EXPERIMENT: Previous model found no solution.")
-
-                # Save empty result for this experiment
-                res_path = os.path.join(res_dir, f'{instance_id}.json')
-
-                # Load existing data if available
-                data = {}
-                if os.path.exists(res_path):
-                    with open(res_path) as f:
-                        data = json.load(f)
-
-                # Update data with empty result
+            prev_instance_data = results_cache.get(prev_instance_id)
+            if prev_instance_data is None:
+                print(f"  WARNING: Could not read previous results for {prev_instance_id}")
+                raise FileNotFoundError(res_dir / f'{prev_instance_id}.json')
+
+        # Results of this instance, updated in memory and written once at the end
+        res_path = res_dir / f'{instance_id}.json'
+        data = results_cache.get(instance_id, {})
+
+        # Decide which experiments to skip based on previous results
+        # (an experiment missing from them, e.g. newly added, is run)
+        skipped_exps = {}
+        if prev_instance_data:
+            for exp_name in EXPERIMENTS_CONFIG:
+                prev_result = prev_instance_data.get(exp_name)
+                # Only a run without any solution is skipped onwards: a timed-out
+                # run that still has a (best-so-far) solution is run again
+                if prev_result is not None and len(prev_result['sol']) == 0:
+                    skipped_exps[exp_name] = "Previous model found no solution."
+
+        to_run = []
+        for exp_name in EXPERIMENTS_CONFIG:
+            if exp_name in skipped_exps:
+                print(f"\n  EXPERIMENT: {exp_name:<35} SKIP: {skipped_exps[exp_name]}")
+
+                # Record empty result for this experiment
                 data[exp_name] = {
-                    "time": 300,
+                    "time": TIMEOUT,
                     "optimal": False,
                     "obj": "None",
                     "sol": []
                 }
-
-                # Write the JSON to the destination file
-                with open(res_path, 'w') as f:
-                    json.dump(data, f, indent=4)
-
             else:
-                # Build the command to call the SMT solver script
-                cmd = [
-                    sys.executable,
-                    "solve_smt_instance.py",
-                    str(EXPERIMENTS_CONFIG[exp_name]['model']),
-                    str(EXPERIMENTS_CONFIG[exp_name]['smt_solver']),
-                    instance_file,
-                    str(EXPERIMENTS_CONFIG[exp_name]['use_symmetry_breaking']),
-                    str(EXPERIMENTS_CONFIG[exp_name]['optimization']),
-                    exp_name,
-                ]
-
-                # Execute the command
+                to_run.append(exp_name)
+
+        # Run the remaining experiments in worker processes
+        n_value = read_n(instance_file)
+        if args.cpu_budget:
+            # Opt-in: one worker process per core of the budget, at most; the
+            # cores they leave free go to Z3's parallel mode (workers x threads
+            # stays within the budget)
+            workers = max(1, min(len(to_run), args.cpu_budget))
+            threads = max(1, args.cpu_budget // workers)
+        else:
+            # No budget: one experiment at a time, so no timed run shares the CPU
+            workers = 1
+            threads = 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for exp_name in to_run:
+                config = EXPERIMENTS_CONFIG[exp_name]
+                future = executor.submit(
+                    solve_smt_instance, config['model'], config['smt_solver'], n_value,
+                    config['use_symmetry_breaking'] == 'true', config['optimization'] == 'true',
+                    exp_name, TIMEOUT, threads)
+                futures[future] = exp_name
+            for future in as_completed(futures):
+                print(f"\n  EXPERIMENT: {futures[future]}")
                 try:
-                    result = subprocess.run(cmd, text=True)
-
-                    if result.returncode == 0:
-                        print(f"  STATUS: {'SUCCESS':<10}")
-                    else:
-                        print(f"  STATUS: {'ERROR':<10}")
-                        if result.stderr:
-                            print(f"  ERROR_MSG: {result.stderr.strip()}")
-
+                    data.update(future.result())
+                    print(f"  STATUS: {'SUCCESS':<10}")
                 except Exception as e:
                     print(f"  STATUS: {'EXCEPTION':<10}")
-                    print(f"  ERROR_MSG: Failed to execute subprocess: {e}")
+                    print(f"  ERROR_MSG: {e}")
 
-            print(f"  {'─' * 60}")
+        # Write the instance results once (skipped and solved experiments)
+        res_dir.mkdir(parents=True, exist_ok=True)
+        write_results(res_path, data)
+        results_cache[instance_id] = data
 
     # Print completion message
     print("\n\n" + "*" * 50)
@@ -6,36 +6,70 @@ SMT-InstanceSolver: Run SMT models (HA/RR) through Z3 or CVC5 CLI
 import os
 import json
 import argparse
+import hashlib
 import pathlib
 import subprocess
-import jsbeautifier
 import time
 import math
+from functools import lru_cache
 import re
+import signal
+from threading import Event, Thread, Timer
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import z3
 
 # Import SMT models
 from smt_model_ha import SMTModelHA
-from smt_model_rr import SMTModelRR
+from smt_model_rr import SMTModelRR, match_tables
 
+# Solved configurations, keyed by (model, solver, n, flags, timeout, threads, model sources)
+CACHE_DIR = pathlib.Path(__file__).parent.parent.parent / 'res' / 'SMT' / '_cache'
+MODEL_SOURCES = [pathlib.Path(__file__).parent / name for name in ("smt_model_ha.py", "smt_model_rr.py")]
 
-def parse_decision_output(output_text: str, model: str, n: int, A=None, B=None):
+# CVC5 command line, and the marker echoed after each answer of the long-lived process
+CVC5_CMD = ["cvc5", "--lang=smt2", "--produce-models", "--incremental"]
+_END_MARKER = "===END==="
+_cvc5_proc = None
+
+# Instance size declaration, e.g. "n=10;"
+_N_RE = re.compile(r'n\s*=\s*(\d+);')
+# One (name value) pair of a (get-value ...) answer, e.g. (H_1_2 3) or (pos_1_1_2 true)
+_VALUE_RE = re.compile(r"\(\s*([A-Za-z_]\w*)\s+([^()\s]+)\s*\)")
+
+
+def decision_var_names(model: str, n: int) -> list:
     """
-    Parse the text output from a CLI solver (z3/cvc5) for decision problems.
-    It reconstructs the schedule from the variable assignments.
+    Names of the variables a decision schedule is read from: H/A per slot
+    for HA, the one-hot pos literals for RR.
     """
-    # Check if the problem was satisfiable (for CVC5, while Z3 would throw an error)
-    out_lower = output_text.lower()
-    if "unsat" in out_lower or "sat" not in out_lower:
-        print("  The instance is UNSATISFIABLE")
-        return None
+    W, P = n - 1, n // 2
+    if model == 'ha':
+        return [f"{side}_{p + 1}_{w + 1}" for p in range(P) for w in range(W) for side in ("H", "A")]
+    return [f"pos_{w + 1}_{p + 1}_{k + 1}" for w in range(W) for p in range(P) for k in range(P)]
+
 
-    # Parse all model variable assignments from the solver's output
+def parse_decision_output(lines, model: str, n: int, A=None, B=None):
+    """
+    Parse the output of a CLI solver (cvc5) for decision problems, consumed
+    line by line as the solver prints it: the check-sat status, then the
+    (get-value ...) answer, (name value) pairs for the variables of
+    decision_var_names. A pair never spans two lines, so only the
+    assignments are kept, never the whole output.
+    Returns: (status, schedule), the schedule being None unless sat.
+    """
+    status = None
     values = {}
-    # This regex captures variable names and their integer values
-    for match in re.finditer(r"\(define-fun\s+(\S+)\s+\(\)\s+\S+\s+([^)]+)\)", output_text):
-        var, val_str = match.groups()
-        values[var] = int(val_str.strip())
+    for line in lines:
+        stripped = line.strip()
+        if stripped in ("sat", "unsat", "unknown"):
+            status = stripped
+            continue
+        for match in _VALUE_RE.finditer(line):
+            var, val_str = match.groups()
+            values[var] = val_str
+
+    if status != "sat":
+        return status, None
 
     W, P = n - 1, n // 2
     schedule = []
@@ -46,18 +80,41 @@ def parse_decision_output(output_text: str, model: str, n: int, A=None, B=None):
             row = []
             for w in range(W):
                 h_var, a_var = f"H_{p + 1}_{w + 1}", f"A_{p + 1}_{w + 1}"
-                row.append([values[h_var], values[a_var]])
+                row.append([int(values[h_var]), int(values[a_var])])
             schedule.append(row)
 
     elif model == 'rr':
         for p in range(P):
             row = []
             for w in range(W):
-                pos_var = f"pos_{w + 1}_{p + 1}"
-                k = values[pos_var] - 1
+                # pos is one-hot: pick the match index whose literal is true
+                k = next(k for k in range(P) if values.get(f"pos_{w + 1}_{p + 1}_{k + 1}") == "true")
                 row.append([A[w][k], B[w][k]])
             schedule.append(row)
 
+    return status, schedule
+
+
+def parse_decision_model(z3_model, model: str, Home=None, Away=None, pos_vars=None, A=None, B=None):
+    """
+    Read the schedule of a decision problem from a Z3 model object (Python API),
+    evaluating the variables returned by the model builder.
+    """
+    if model == 'ha':
+        return [
+            [[z3_model.eval(h).as_long(), z3_model.eval(a).as_long()] for h, a in zip(Home[p], Away[p])]
+            for p in range(len(Home))
+        ]
+
+    W, P = len(pos_vars), len(pos_vars[0])
+    schedule = []
+    for p in range(P):
+        row = []
+        for w in range(W):
+            # Get the match index whose one-hot 'pos' literal is true
+            k = next(k for k, lit in enumerate(pos_vars[w][p]) if z3.is_true(z3_model.eval(lit)))
+            row.append([A[w][k], B[w][k]])
+        schedule.append(row)
     return schedule
 
 
@@ -76,8 +133,8 @@ def parse_optimization_output(z3_model, pos_vars, swap_vars, A, B, obj_var):
     for p in range(P):
         row = []
         for w in range(W):
-            # Get the value for the position variable 'pos'
-            k = z3_model.eval(pos_vars[w][p]).as_long() - 1
+            # Get the match index whose one-hot 'pos' literal is true
+            k = next(k for k, lit in enumerate(pos_vars[w][p]) if z3.is_true(z3_model.eval(lit)))
             # Check if the 'swap' variable is true
             is_swapped = z3.is_true(z3_model.eval(swap_vars[w][p]))
 
@@ -87,72 +144,259 @@ def parse_optimization_output(z3_model, pos_vars, swap_vars, A, B, obj_var):
 
     return schedule, obj_value
 
-def solve_smt_instance(model, solver_name, n_value, use_symmetry_breaking, optimization, test_name, timeout=300):
+def build_model(model, n_value, optimization, use_symmetry_breaking, use_pb):
     """
-    Main solver function. It orchestrates the solving process by choosing
-    between the Python API (for optimization) and a CLI solver (for decision).
+    Build the solver for the given model.
+    Returns: (solver, variables), variables holding the references needed to
+    decode a model (Home/Away for HA; pos/swap/A/B/obj for RR, the others None).
     """
-    # --- 1. Build the appropriate solver from the model file ---
-    if model.lower() == "rr":
-        solver, pos_vars, swap_vars, A, B, obj_var = SMTModelRR.build_solver(n_value, optimization, use_symmetry_breaking)
-    elif model.lower() == "ha":
-        solver = SMTModelHA.build_solver(n_value, use_symmetry_breaking)
+    if model == "rr":
+        solver, pos_vars, swap_vars, A, B, obj_var = SMTModelRR.build_solver(
+            n_value, optimization, use_symmetry_breaking, use_pseudo_boolean=use_pb)
+        # Initialize HA-specific variables to None for consistency
+        Home, Away = None, None
+    elif model == "ha":
+        solver, Home, Away = SMTModelHA.build_solver(n_value, use_symmetry_breaking, use_pseudo_boolean=use_pb)
         # Initialize RR-specific variables to None for consistency
         pos_vars, swap_vars, A, B, obj_var = None, None, None, None, None
     else:
         raise ValueError(f"Unknown model: {model}")
+    return solver, (Home, Away, pos_vars, swap_vars, A, B, obj_var)
 
-    # --- 2. Solve the instance using the correct method ---
-    start_time = time.time()
+
+def solve_z3_api(solver, variables, model, optimization, timeout, threads=1):
+    """
+    Check a Z3 Solver/Optimize in-process and decode its model.
+    threads > 1 enables Z3's parallel mode with up to that many threads.
+    Returns: (solution, obj, optimal, elapsed_time).
+    """
+    Home, Away, pos_vars, swap_vars, A, B, obj_var = variables
     solution, obj, optimal = None, None, False
 
-    try:
-        if optimization:
-            # --- API-based execution for RR Optimization ---
-            solver.set("timeout", timeout * 1000)  # Z3 timeout is in milliseconds
-            status = solver.check()
-            elapsed_time = time.time() - start_time
+    # Z3's parallel mode is a global setting: enable it for this check only
+    if threads > 1:
+        saved_params = {name: z3.get_param(name) for name in ('parallel.enable', 'parallel.threads.max')}
+        z3.set_param('parallel.enable', True)
+        z3.set_param('parallel.threads.max', threads)
 
-            if status == z3.sat:
+    try:
+        start_time = time.time()
+        solver.set("timeout", timeout * 1000)  # Z3 timeout is in milliseconds
+        status = solver.check()
+        elapsed_time = time.time() - start_time
+    finally:
+        if threads > 1:
+            for name, value in saved_params.items():
+                z3.set_param(name, value)
+
+    if optimization:
+        # --- RR Optimization ---
+        # sat: Z3 proved the optimum. unknown (timeout): Optimize still holds
+        # the best model found so far, optimal only if it meets the lower bound
+        if status == z3.sat:
+            solution, obj = parse_optimization_output(solver.model(), pos_vars, swap_vars, A, B, obj_var)
+            optimal = True
+        elif status == z3.unknown:
+            try:
                 z3_model = solver.model()
+            except z3.Z3Exception:
+                z3_model = None  # no solution found within the timeout
+            if z3_model is not None and len(z3_model) > 0:
                 solution, obj = parse_optimization_output(z3_model, pos_vars, swap_vars, A, B, obj_var)
-                optimal = (solution is not None and elapsed_time < timeout and obj < 2)
+                lower = solver.lower_values()[0]
+                optimal = z3.is_int_value(lower) and lower.as_long() >= obj
+        elif status == z3.unsat:
+            print("  The instance is UNSATISFIABLE")
+    else:
+        # --- Decision Problems: the model is already a z3.Solver, no SMT-LIB round-trip ---
+        if status == z3.sat:
+            solution = parse_decision_model(solver.model(), model, Home, Away, pos_vars, A, B)
+            optimal = elapsed_time < timeout
+        elif status == z3.unsat:
+            print("  The instance is UNSATISFIABLE")
 
+    return solution, obj, optimal, elapsed_time
 
-        else:
-            # --- CLI-based execution for Decision Problems (HA and RR) ---
-            smtlib_str = solver.to_smt2() + "\n(check-sat)\n(get-model)\n"
-            cmd = (
-                ["z3", "-in"]
-                if solver_name.lower() == "z3"
-                else ["cvc5", "--lang=smt2", "--produce-models", "--incremental"]
-            )
-
-            result = subprocess.run(cmd, input=smtlib_str, text=True, capture_output=True, timeout=timeout)
-            elapsed_time = time.time() - start_time
-
-            if result.returncode == 0:
-                solution = parse_decision_output(result.stdout, model.lower(), n_value, A, B)
-                optimal = (solution is not None and elapsed_time < timeout)
-
-            else:
-                if "unsat" in result.stdout.lower():
-                    print("  The instance is UNSATISFIABLE")
+
+def kill_process_group(proc):
+    """
+    SIGKILL the whole process group of a solver started with start_new_session=True.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # already exited
+
+
+@lru_cache(maxsize=None)
+def build_smt2(model, n_value, use_symmetry_breaking) -> str:
+    """
+    SMT-LIB script of a decision model (without pseudo-Boolean atoms), as fed
+    to the CLI solvers: declarations and assertions only, the caller issues
+    (check-sat) and the queries. Memoized in-process and stored on disk under
+    a hash of the parameters and of MODEL_SOURCES: on a hit the Z3 AST is not
+    built at all.
+    """
+    key = hashlib.sha1(f"{model}|{n_value}|{use_symmetry_breaking}|no-check-sat".encode())
+    for src in MODEL_SOURCES:
+        key.update(src.read_bytes())
+    smt2_path = CACHE_DIR / f"{key.hexdigest()}.smt2"
+
+    if smt2_path.exists():
+        return smt2_path.read_text()
+
+    solver, _ = build_model(model, n_value, False, use_symmetry_breaking, False)
+    smt2 = solver.to_smt2().rstrip()
+    # to_smt2() ends with its own (check-sat): drop it, or CVC5 would solve twice
+    if smt2.endswith("(check-sat)"):
+        smt2 = smt2[:-len("(check-sat)")]
+
+    # Each worker writes its own pid-suffixed copy; os.replace swaps it in whole
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = smt2_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(smt2)
+    os.replace(tmp_path, smt2_path)
+    return smt2
+
+
+def cvc5_process():
+    """
+    Long-lived CVC5 process of this (worker) process, started on first use and
+    restarted once it has exited (e.g. killed on a timeout). Solves are sent
+    to it one after the other, separated by (reset), so fork/exec and solver
+    start-up are paid once per worker instead of once per experiment.
+    """
+    global _cvc5_proc
+    if _cvc5_proc is None or _cvc5_proc.poll() is not None:
+        # Own session (process group), so a timeout can kill CVC5 with any helper it spawned;
+        # errors are printed on stdout and read along with the answer
+        _cvc5_proc = subprocess.Popen(CVC5_CMD, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, text=True, start_new_session=True)
+    return _cvc5_proc
+
+
+def solve_cvc5_cli(smt2, model, n_value, A, B, timeout, stop=None):
+    """
+    Solve a decision problem with the (long-lived) CVC5 process, fed its
+    SMT-LIB script (build_smt2) and read until the end marker it echoes.
+    Setting the optional `stop` event kills CVC5 early (e.g. a lost portfolio race).
+    Returns: (solution, optimal, elapsed_time); raises subprocess.TimeoutExpired
+    when CVC5 is still running after `timeout` seconds.
+    """
+    # Ask only for the schedule variables, not a full (get-model) dump
+    query = " ".join(f"({name})" for name in decision_var_names(model, n_value))
+
+    start_time = time.time()
+    proc = cvc5_process()
+    finished = Event()
+    errors = []
+
+    def answer_lines():
+        # The answer of this solve: the lines up to the echoed end marker
+        for line in proc.stdout:
+            if line.strip().strip('"') == _END_MARKER:
+                finished.set()
+                return
+            if line.startswith("(error"):
+                errors.append(line.strip())
+            yield line
+
+    # Watchdog: reading the output blocks, so the timeout kills the process group
+    timer = Timer(timeout, kill_process_group, args=(proc,))
+    timer.daemon = True
+    timer.start()
+    if stop is not None:
+        Thread(target=lambda: stop.wait(timeout) and not finished.is_set() and kill_process_group(proc),
+               daemon=True).start()
+    try:
+        # Stream the script through the pipe piece by piece (logic, then
+        # the encoding, then the queries) instead of one buffered input:
+        # CVC5 starts parsing while the rest is still being written
+        try:
+            # Both models are quantifier-free linear integer arithmetic
+            proc.stdin.write("(reset)\n(set-logic QF_LIA)\n")
+            proc.stdin.flush()
+            proc.stdin.write(smt2)
+            proc.stdin.flush()
+            proc.stdin.write(f"\n(check-sat)\n(get-value ({query}))\n(echo \"{_END_MARKER}\")\n")
+            proc.stdin.flush()
+        except BrokenPipeError:
+            pass  # killed by the watchdog (or crashed) while reading its input
+
+        # Consume the answer as it is printed instead of buffering all stdout
+        status, solution = parse_decision_output(answer_lines(), model, n_value, A, B)
+    finally:
+        # Cancel timer if finished early
+        timer.cancel()
+        # An unfinished answer leaves the stream out of sync: never reuse (or
+        # leave running) that process (e.g. on KeyboardInterrupt/SystemExit)
+        if not finished.is_set():
+            kill_process_group(proc)
+            proc.wait()
+    elapsed_time = time.time() - start_time
+
+    if elapsed_time >= timeout:
+        raise subprocess.TimeoutExpired(CVC5_CMD, timeout)
+    if status == "unsat":
+        print("  The instance is UNSATISFIABLE")
+    elif not finished.is_set() or errors:
+        raise Exception(
+            "Error occurred while running the CVC5 SMT solver.",
+            f"CODE: {proc.returncode}",
+            f"DETAILS: {' '.join(errors)}"
+        )
+    return solution, solution is not None, elapsed_time
+
+
+def solve_portfolio(model, n_value, use_symmetry_breaking, timeout):
+    """
+    Race Z3 (Python API, in a thread) and the CVC5 CLI on a decision problem:
+    the first solver returning a schedule wins and the other one is stopped
+    (Z3 interrupted, the CVC5 process group killed).
+    Returns: (solution, optimal, elapsed_time, winner), winner None if neither found one.
+    """
+    smt2 = build_smt2(model, n_value, use_symmetry_breaking)
+    solver, variables = build_model(model, n_value, False, use_symmetry_breaking, True)
+    A, B = variables[4], variables[5]
+    stop = Event()
+
+    # Timed from here, after construction, as the single-solver paths are
+    start_time = time.time()
+
+    solution, optimal, winner = None, False, None
+    # Z3 releases the GIL while checking, so both solvers really run concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        z3_future = executor.submit(solve_z3_api, solver, variables, model, False, timeout)
+        cvc5_future = executor.submit(solve_cvc5_cli, smt2, model, n_value, A, B, timeout, stop)
+        for future in as_completed([z3_future, cvc5_future]):
+            try:
+                if future is z3_future:
+                    found, _, found_optimal, _ = future.result()
                 else:
-                    raise Exception(
-                        f"Error occurred while running the {'Z3' if solver_name.lower() == "z3" else 'CVC5'} SMT solver.",
-                        f"CODE: {result.returncode}",
-                        f"DETAILS: {result.stdout}"
-                    )
+                    found, found_optimal, _ = future.result()
+            except Exception:
+                continue  # timed out or failed: the other solver may still answer
+            if found is not None:
+                solution, optimal = found, found_optimal
+                winner = "z3" if future is z3_future else "cvc5"
+                break
 
-    except subprocess.TimeoutExpired:
-        elapsed_time = timeout
-    except Exception as e:
-        raise Exception(f"An unexpected error occurred for {test_name}: {e}")
+        # Stop the loser (the interrupt would leak into the next check if Z3 were idle)
+        stop.set()
+        if not z3_future.done():
+            solver.ctx.interrupt()
+
+    return solution, optimal, time.time() - start_time, winner
 
+
+def format_result(test_name, solution, obj, optimal, elapsed_time, timeout):
+    """
+    Shape one experiment's outcome as a results entry ({test_name: {...}}).
+    """
     return {
         test_name.lower(): {
-            "time": math.floor(elapsed_time) if solution is not None else timeout,
+            # Clamped: a timed-out Optimize keeps its best model but may overshoot the timeout
+            "time": min(math.floor(elapsed_time), timeout) if solution is not None else timeout,
             "optimal": optimal,
             "obj": obj if obj is not None else "None",
             "sol": solution if solution is not None else [],
@@ -160,11 +404,158 @@ def solve_smt_instance(model, solver_name, n_value, use_symmetry_breaking, optim
     }
 
 
+@lru_cache(maxsize=None)
+def cvc5_version() -> str:
+    """
+    First line of `cvc5 --version` ("cvc5 unavailable" if it cannot be run).
+    """
+    try:
+        output = subprocess.run([CVC5_CMD[0], "--version"], capture_output=True, text=True).stdout
+    except OSError:
+        return "cvc5 unavailable"
+    return output.splitlines()[0] if output else "cvc5 unavailable"
+
+
+def result_cache_path(model, solver_name, n_value, use_symmetry_breaking, optimization, timeout,
+                      threads=1) -> pathlib.Path:
+    """
+    Cache file of a configuration: sha1 of every parameter the result depends
+    on, of the solver versions, and of the sources of both the models and this
+    driver (how a solver is run changes the recorded time, not just the answer).
+    """
+    versions = f"z3 {z3.get_version_string()}"
+    if solver_name.lower() in ("cvc5", "portfolio"):
+        versions += f"|{cvc5_version()}"
+    key = hashlib.sha1(
+        f"{model.lower()}|{solver_name.lower()}|{n_value}|{use_symmetry_breaking}|{optimization}|{timeout}|"
+        f"{threads}|{versions}".encode()
+    )
+    for src in [*MODEL_SOURCES, pathlib.Path(__file__)]:
+        key.update(src.read_bytes())
+    return CACHE_DIR / f"{key.hexdigest()}.json"
+
+
+def load_cached_result(cache_path, test_name):
+    """
+    Results entry ({test_name: {...}}) of an already solved configuration, or None.
+    """
+    if not cache_path.exists():
+        return None
+    with open(cache_path, 'r') as f:
+        return {test_name.lower(): json.load(f)}
+
+
+def store_cached_result(cache_path, result: dict, timeout):
+    """
+    Cache the single entry of a results dict (written atomically).
+    Timed-out or empty results are not cached, so they are retried next run.
+    """
+    entry = next(iter(result.values()))
+    if not entry["sol"] or entry["time"] >= timeout:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, cache_path)
+
+
+def solve_smt_instance(model, solver_name, n_value, use_symmetry_breaking, optimization, test_name, timeout=300,
+                       threads=1):
+    """
+    Main solver function. It orchestrates the solving process by choosing
+    between the Z3 Python API (optimization, and decision with Z3), the
+    CVC5 CLI (decision with CVC5) and a race of both (decision with portfolio).
+    threads: Z3 threads for the API runs (see solve_z3_api).
+    Results are cached per configuration: identical runs are not solved again.
+    """
+    cache_path = result_cache_path(model, solver_name, n_value, use_symmetry_breaking, optimization, timeout,
+                                   threads)
+    cached = load_cached_result(cache_path, test_name)
+    if cached is not None:
+        return cached
+
+    # --- 1. Build the appropriate solver from the model file ---
+    # Pseudo-Boolean atoms only when Z3 solves it (CVC5 cannot parse pbeq/pble)
+    use_z3 = optimization or solver_name.lower() == "z3"
+    portfolio = not use_z3 and solver_name.lower() == "portfolio"
+    if use_z3:
+        solver, variables = build_model(model.lower(), n_value, optimization, use_symmetry_breaking, True)
+    elif not portfolio:
+        # CVC5 only needs the SMT-LIB text (cached) and the RR match tables to decode
+        smt2 = build_smt2(model.lower(), n_value, use_symmetry_breaking)
+        A, B = match_tables(n_value) if model.lower() == "rr" else (None, None)
+
+    # --- 2. Solve the instance using the correct method ---
+    solution, obj, optimal, winner = None, None, False, None
+
+    try:
+        if portfolio:
+            # --- Portfolio: Z3 and CVC5 race, the first schedule wins ---
+            solution, optimal, elapsed_time, winner = solve_portfolio(
+                model.lower(), n_value, use_symmetry_breaking, timeout)
+
+        elif use_z3:
+            # --- API-based execution (RR optimization, decision with Z3) ---
+            solution, obj, optimal, elapsed_time = solve_z3_api(
+                solver, variables, model.lower(), optimization, timeout, threads)
+
+        else:
+            # --- CLI-based execution for Decision Problems with CVC5 ---
+            solution, optimal, elapsed_time = solve_cvc5_cli(smt2, model.lower(), n_value, A, B, timeout)
+
+    except subprocess.TimeoutExpired:
+        elapsed_time = timeout
+    except Exception as e:
+        raise Exception(f"An unexpected error occurred for {test_name}: {e}")
+
+    result = format_result(test_name, solution, obj, optimal, elapsed_time, timeout)
+    if portfolio:
+        # Record which solver won the race
+        result[test_name.lower()]["solver"] = winner if winner is not None else "None"
+    store_cached_result(cache_path, result, timeout)
+    return result
+
+
+def read_n(instance_path) -> int:
+    """
+    Extract n_value from the instance file (declared on its first line).
+    """
+    with open(instance_path, 'r') as f:
+        match = _N_RE.search(f.readline())
+        return int(match.group(1))
+
+
+def format_results(data: dict) -> str:
+    """
+    Results file text: one field per line, each value (the whole `sol`
+    matrix included) kept on its line, in json.dumps' spacing, as in the
+    result files of every method.
+    """
+    entries = []
+    for test_name, result in data.items():
+        fields = ",\n".join(
+            f"        {json.dumps(key)}: {json.dumps(value)}"
+            for key, value in result.items()
+        )
+        entries.append(f"    {json.dumps(test_name)}: {{\n{fields}\n    }}")
+    return "{\n" + ",\n".join(entries) + "\n}"
+
+
+def write_results(res_path, data: dict):
+    """
+    Format the results and write them to res_path.
+    """
+    with open(res_path, 'w') as f:
+        f.write(format_results(data))
+
+
 def main():
     parser = argparse.ArgumentParser(description="SMT-InstanceSolver: run SMT models with Z3 or CVC5")
 
     parser.add_argument("model", help="Solve the problem with HA or RR method", choices=["ha", "rr"])
-    parser.add_argument("solver_name", help="SMT solver to use", choices=["z3", "cvc5"])
+    parser.add_argument("solver_name", help="SMT solver to use (portfolio: race Z3 and CVC5)",
+                        choices=["z3", "cvc5", "portfolio"])
     parser.add_argument(
         "instance_path",
         help="Path to the file instance to test",
@@ -176,14 +567,12 @@ def main():
                         type=lambda x: x.lower() == 'true')
     parser.add_argument("test_name", help="Name for the test (used as JSON key)", type=str)
     parser.add_argument("-t", "--timeout", help="Timeout in seconds (default: 300)", type=int, default=300)
+    parser.add_argument("--threads", help="Threads for Z3's parallel mode (default: 1)", type=int, default=1)
 
     args = parser.parse_args()
 
     # Extract n_value from the file content
-    with open(args.instance_path, 'r') as f:
-        content = f.read()
-        match = re.search(r'n\s*=\s*(\d+);', content)
-        n_value = int(match.group(1))
+    n_value = read_n(args.instance_path)
 
     # Solve the instance with the given parameters
     result = solve_smt_instance(
@@ -193,7 +582,8 @@ def main():
         args.use_symmetry_breaking,
         args.optimization,
         args.test_name,
-        args.timeout
+        args.timeout,
+        args.threads
     )
 
     # Save result
@@ -214,14 +604,7 @@ def main():
     data.update(result)
 
     # Beautify and save the JSON output
-    opts = jsbeautifier.default_options()
-    opts.keep_array_indentation = True
-
-    beautified_json = jsbeautifier.beautify(json.dumps(data), opts)
-
-    # Write the beautified JSON to the destination file
-    with open(res_path, 'w') as f:
-        f.write(beautified_json)
+    write_results(res_path, data)
 
     print(f"  Result saved to: {res_path}")
     return 0